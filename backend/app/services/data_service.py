@@ -130,7 +130,11 @@ class DataService:
         """获取K线数据"""
         try:
             kline_result = self.data_fetcher.get_kline_data(stock_code, kline_type=kline_type, num_periods=num_periods)
-            
+
+            # 'arrays'是给筛选流程用的numpy列视图，无法JSON序列化；
+            # 浅拷贝后剔除，避免改动fetcher缓存中的原字典
+            kline_result = {k: v for k, v in kline_result.items() if k != 'arrays'}
+
             # 增加Web应用需要的附加属性
             if 'metadata' in kline_result:
                 kline_result['metadata']['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -3,6 +3,9 @@ import json
 import time
 from datetime import datetime
 
+# 复用同一连接池：基准测试各轮走keep-alive，与data_fetcher的会话行为一致
+session = requests.Session()
+
 def benchmark_sina_api(stock_code='sh600000', num_periods=10, num_runs=3):
     """Benchmark the Sina Finance API for K-line data retrieval"""
     total_time = 0
@@ -33,7 +36,7 @@ def benchmark_sina_api(stock_code='sh600000', num_periods=10, num_runs=3):
         start = time.time()
         try:
             # Send request
-            response = requests.get(url, params=params, headers=headers, timeout=5)
+            response = session.get(url, params=params, headers=headers, timeout=5)
             elapsed = time.time() - start
             
             if response.status_code == 200:
@@ -145,7 +148,7 @@ def benchmark_eastmoney_api(stock_code='sh600000', num_periods=10, num_runs=3):
         start = time.time()
         try:
             # Send request
-            response = requests.get(url, params=params, headers=headers, timeout=5)
+            response = session.get(url, params=params, headers=headers, timeout=5)
             elapsed = time.time() - start
             
             if response.status_code == 200:
@@ -181,7 +184,7 @@ def benchmark_eastmoney_api(stock_code='sh600000', num_periods=10, num_runs=3):
                     # Try an alternate URL - this is what's used in the data_fetcher.py
                     url_alt = f"http://push2.eastmoney.com/api/qt/stock/kline/get"
                     alt_start = time.time()
-                    alt_response = requests.get(url_alt, params=params, headers=headers, timeout=5)
+                    alt_response = session.get(url_alt, params=params, headers=headers, timeout=5)
                     alt_elapsed = time.time() - alt_start
                     
                     if alt_response.status_code == 200:
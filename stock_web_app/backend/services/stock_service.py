@@ -97,7 +97,11 @@ class StockService:
             K线数据，包含开盘价，收盘价，最高价，最低价，成交量等
         """
         kline_result = self.data_fetcher.get_kline_data(stock_code, kline_type, num_periods)
-        
+
+        # 'arrays'是给筛选流程用的numpy列视图，无法JSON序列化；
+        # 浅拷贝后剔除，避免改动fetcher缓存中的原字典
+        kline_result = {k: v for k, v in kline_result.items() if k != 'arrays'}
+
         # 缓存K线数据到数据库
         self._cache_kline_data(stock_code, kline_result)
         